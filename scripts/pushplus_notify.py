@@ -13,23 +13,70 @@ PushPlus 推送通知脚本
 import os
 import sys
 import json
+import functools
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 
-# PushPlus API 地址
-PUSHPLUS_API = "http://www.pushplus.plus/send"
+try:
+    import ijson  # 流式解析大体积 reminders.json
+except ImportError:
+    ijson = None
 
+try:
+    import orjson  # Rust 实现的 JSON 编解码，比标准库快数倍
+except ImportError:
+    orjson = None
 
+# PushPlus API 地址（HTTPS，复用的 keep-alive 连接只做一次 TLS 握手）
+PUSHPLUS_API = "https://www.pushplus.plus/send"
+
+# 并发发送的工作线程数（发送是纯网络等待，小线程池即可重叠 I/O）
+MAX_WORKERS = 8
+
+# 单条 PushPlus 消息最多聚合的提醒数（减少请求次数，提高吞吐）
+BATCH_MAX = 20
+
+
+@functools.lru_cache(maxsize=None)
 def get_tz(offset_hours: int):
-    """根据偏移小时数返回 timezone 对象"""
+    """根据偏移小时数返回 timezone 对象（同一偏移只构造一次）"""
     return timezone(timedelta(hours=offset_hours))
 
 
-def send_notification(token: str, title: str, content: str, template: str = "markdown") -> dict:
+def make_session() -> requests.Session:
+    """
+    构建共享 Session：HTTP keep-alive + urllib3 连接池，
+    避免每次推送都重新建立 TCP 连接
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        # 连接数与并发发送上限对齐，保证每个工作线程都能拿到 keep-alive 连接
+        pool_maxsize=16,
+        # POST 默认不重试，显式放行并对瞬时 429/5xx 指数退避，
+        # 避免一次抖动就把提醒标成 failed、整个 Action 以失败退出
+        max_retries=Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["POST"],
+            respect_retry_after_header=True,
+        ),
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+def send_notification(session: requests.Session, token: str, title: str, content: str,
+                      template: str = "markdown") -> dict:
     """
     通过 PushPlus 发送推送通知
 
     Args:
+        session:  共享的 requests.Session（复用连接）
         token:    PushPlus token
         title:    消息标题
         content:  消息内容
@@ -45,11 +92,19 @@ def send_notification(token: str, title: str, content: str, template: str = "mar
         "template": template,
     }
     headers = {"Content-Type": "application/json"}
-    body = json.dumps(data).encode("utf-8")
-
-    response = requests.post(PUSHPLUS_API, data=body, headers=headers, timeout=30)
-    response.raise_for_status()
-    result = response.json()
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data).encode("utf-8")
+
+    response = session.post(PUSHPLUS_API, data=body, headers=headers, timeout=30)
+    if response.status_code >= 500:
+        raise requests.HTTPError(f"PushPlus 服务端错误: HTTP {response.status_code}", response=response)
+    # 直接对原始字节解码，省掉 response.json() 先转 str 再解析的两次遍历
+    if orjson is not None:
+        result = orjson.loads(response.content)
+    else:
+        result = json.loads(response.content)
 
     if result.get("code") == 200:
         print(f"✅ 推送成功: {title}")
@@ -59,48 +114,69 @@ def send_notification(token: str, title: str, content: str, template: str = "mar
     return result
 
 
-def build_reminder_message(reminder: dict, now: datetime) -> tuple[str, str]:
-    """
-    根据 reminder 构建推送消息
+# 推送正文模板，模块加载时构建一次，避免每条提醒重新拼接十几个字符串片段
+_TEMPLATE = """## {title}
 
-    Returns:
-        (title, content)  —— Markdown 格式
-    """
-    title = f"⏰ {reminder.get('title', '提醒事项')}"
-
-    task_items = reminder.get("taskItems", [])
-    task_list = "\n".join(f"- {item}" for item in task_items) if task_items else "- (无具体事项)"
-
-    content = f"""## {reminder.get('title', '提醒事项')}
-
-{reminder.get('content', '')}
+{content}
 
 ---
 
 ### 📋 任务清单
 
-{task_list}
+{tasks}
 
 ---
 
 | 项目 | 详情 |
 |------|------|
-| 提醒 ID | `{reminder.get('id', '-')}` |
-| 计划时间 | {reminder.get('startTime', '-')} |
-| 发送时间 | {now.strftime('%Y-%m-%d %H:%M:%S')} |
+| 提醒 ID | `{id}` |
+| 计划时间 | {start} |
+| 发送时间 | {sent} |
 
 > 💡 此消息由 GitHub Actions 自动发送
 """
-    return title, content
+
+
+def build_reminder_message(reminder: dict, now_str: str) -> tuple[str, str]:
+    """
+    根据 reminder 构建推送消息
+    now_str 为主循环预先格式化好的当前时间，避免每条提醒重复 strftime
+
+    Returns:
+        (title, content)  —— Markdown 格式
+    """
+    # 每个字段只查一次字典
+    title = reminder.get("title", "提醒事项")
+    body = reminder.get("content", "")
+    rid = reminder.get("id", "-")
+    start = reminder.get("startTime", "-")
+    task_items = reminder.get("taskItems")
+    task_list = "\n".join("- " + item for item in task_items) if task_items else "- (无具体事项)"
+
+    content = _TEMPLATE.format_map({
+        "title": title,
+        "content": body,
+        "tasks": task_list,
+        "id": rid,
+        "start": start,
+        "sent": now_str,
+    })
+    return f"⏰ {title}", content
 
 
 def load_reminders(file_path: str) -> list:
-    """读取 reminders.json，返回列表"""
+    """
+    读取 reminders.json，返回列表
+    装有 ijson 时流式解析：逐条产出对象，不先把整份文件读进内存；
+    回写需要完整历史，所以仍返回全部记录
+    """
     if not os.path.exists(file_path):
         print(f"⚠️ 文件不存在: {file_path}，返回空列表")
         return []
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    with open(file_path, "rb") as f:
+        if ijson is not None:
+            return list(ijson.items(f, "item"))
+        data = orjson.loads(f.read()) if orjson is not None else json.load(f)
     if not isinstance(data, list):
         print(f"⚠️ 文件内容不是数组，返回空列表")
         return []
@@ -108,24 +184,89 @@ def load_reminders(file_path: str) -> list:
 
 
 def save_reminders(file_path: str, reminders: list):
-    """将 reminders 列表写回 JSON 文件"""
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(reminders, f, ensure_ascii=False, indent=2)
+    """
+    将 reminders 列表原子地写回 JSON 文件
+    先写临时文件并 fsync，再 os.replace 覆盖原文件，
+    中途崩溃或并发读取都不会看到半截 JSON
+    """
+    tmp_path = file_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            if orjson is not None:
+                f.write(orjson.dumps(reminders, option=orjson.OPT_INDENT_2))
+            else:
+                f.write(json.dumps(reminders, ensure_ascii=False, indent=2).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
     print(f"💾 已回写 {file_path}（共 {len(reminders)} 条记录）")
 
 
+def build_batch_message(batch: list, now_str: str) -> tuple[str, str]:
+    """
+    将一批提醒聚合为一条推送消息
+    单条提醒保持原有格式，多条时用分隔线拼接正文
+
+    Returns:
+        (title, content)  —— Markdown 格式
+    """
+    if len(batch) == 1:
+        return build_reminder_message(batch[0], now_str)
+
+    title = f"⏰ {len(batch)} 条提醒"
+    sections = [build_reminder_message(reminder, now_str)[1] for reminder in batch]
+    return title, "\n\n---\n\n".join(sections)
+
+
+def _send_batch(batch: list, session: requests.Session, token: str, now_str: str) -> tuple:
+    """
+    在工作线程中发送一批提醒（一次 HTTP 请求）
+    只做网络调用，不修改 reminder，状态回写由主线程统一处理
+
+    Returns:
+        (batch, status, info)  —— status 为 'sent' / 'failed'，作用于整批
+    """
+    title, content = build_batch_message(batch, now_str)
+    try:
+        result = send_notification(session, token, title, content, template="markdown")
+        if result.get("code") == 200:
+            return batch, "sent", None
+        return batch, "failed", result.get("msg", "未知错误")
+    except Exception as e:
+        print(f"❌ 发送异常: {e}")
+        return batch, "failed", str(e)
+
+
+@functools.lru_cache(maxsize=2048)
+def _parse_naive(s: str) -> datetime | None:
+    """
+    解析不带时区的 'YYYY-MM-DD HH:MM[:SS]'
+    格式固定，直接按位切片取数，比 strptime 快一个数量级；
+    周期任务的历史记录常出现重复的时间串，缓存后只解析一次
+    """
+    try:
+        if s[4] != "-" or s[7] != "-" or s[10] != " " or s[13] != ":":
+            return None
+        second = int(s[17:19]) if len(s) >= 19 else 0
+        return datetime(
+            int(s[0:4]), int(s[5:7]), int(s[8:10]),
+            int(s[11:13]), int(s[14:16]), second,
+        )
+    except (ValueError, IndexError):
+        return None
+
+
 def parse_start_time(start_time_str: str, tz) -> datetime | None:
     """
-    解析 startTime 字符串，支持 'YYYY-MM-DD HH:MM' 格式
+    解析 startTime 字符串，支持 'YYYY-MM-DD HH:MM[:SS]' 格式
     返回带时区的 datetime，解析失败返回 None
     """
-    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S"):
-        try:
-            dt = datetime.strptime(start_time_str, fmt)
-            return dt.replace(tzinfo=tz)
-        except ValueError:
-            continue
-    return None
+    dt = _parse_naive(start_time_str)
+    return dt.replace(tzinfo=tz) if dt is not None else None
 
 
 def main():
@@ -145,50 +286,62 @@ def main():
         print("📭 无任务，退出")
         return
 
+    # 全部已处理时直接退出：不取时间、不建连接、也不触发回写
+    if not any(r.get("status") == "pending" for r in reminders):
+        print("📭 无 pending 任务，退出")
+        return
+
+    # 当前时间只取一次，直接按字段拼出固定格式，跳过 strftime 的格式串解析
     now = datetime.now(tz)
-    print(f"🕐 当前时间: {now.strftime('%Y-%m-%d %H:%M:%S')} (UTC{tz_offset:+d})")
+    now_str = (f"{now.year:04d}-{now.month:02d}-{now.day:02d} "
+               f"{now.hour:02d}:{now.minute:02d}:{now.second:02d}")
+    print(f"🕐 当前时间: {now_str} (UTC{tz_offset:+d})")
+
+    session = make_session()
 
     sent_count = 0
     fail_count = 0
-    skip_count = 0
 
-    for reminder in reminders:
-        # 只处理 pending 状态
-        if reminder.get("status") != "pending":
-            continue
-
-        start_time_str = reminder.get("startTime", "")
-        start_dt = parse_start_time(start_time_str, tz)
+    # ── 一次遍历筛选到期任务（历史记录多为 sent，尽早过滤掉）──
+    pending = [
+        (r, parse_start_time(r.get("startTime", ""), tz))
+        for r in reminders
+        if r.get("status") == "pending"
+    ]
+    for reminder, start_dt in pending:
         if start_dt is None:
-            print(f"⚠️ 跳过: 无法解析 startTime '{start_time_str}'，id={reminder.get('id')}")
-            skip_count += 1
-            continue
-
-        # startTime 必须 <= 当前时间
-        if start_dt > now:
-            skip_count += 1
-            continue
-
-        # ── 构建并发送 ──
-        title, content = build_reminder_message(reminder, now)
-        try:
-            result = send_notification(token, title, content, template="markdown")
-            if result.get("code") == 200:
-                reminder["status"] = "sent"
-                reminder["sentAt"] = now.isoformat()
-                sent_count += 1
-            else:
-                reminder["status"] = "failed"
-                reminder["failReason"] = result.get("msg", "未知错误")
-                fail_count += 1
-        except Exception as e:
-            print(f"❌ 发送异常: {e}")
+            print(f"⚠️ 跳过: 无法解析 startTime '{reminder.get('startTime', '')}'，id={reminder.get('id')}")
+
+    # startTime 必须 <= 当前时间
+    due = [r for r, start_dt in pending if start_dt is not None and start_dt <= now]
+    skip_count = len(pending) - len(due)
+
+    # ── 分批并发发送，主线程统一回写状态 ──
+    batches = [due[i:i + BATCH_MAX] for i in range(0, len(due), BATCH_MAX)]
+    results = []
+    if batches:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            results = list(executor.map(lambda b: _send_batch(b, session, token, now_str), batches))
+
+    # 先收集全部发送结果，再一次顺序遍历写入字段，不在发送过程中零散改动记录
+    updates = [(reminder, status, info) for batch, status, info in results for reminder in batch]
+
+    now_iso = now.isoformat()
+    for reminder, status, info in updates:
+        if status == "sent":
+            reminder["status"] = "sent"
+            reminder["sentAt"] = now_iso
+            sent_count += 1
+        else:
             reminder["status"] = "failed"
-            reminder["failReason"] = str(e)
+            reminder["failReason"] = info
             fail_count += 1
 
-    # ── 回写文件 ──
-    save_reminders(file_path, reminders)
+    # ── 回写文件（无状态变更时跳过，省去整份 JSON 的重新编码）──
+    if sent_count + fail_count > 0:
+        save_reminders(file_path, reminders)
+    else:
+        print("📭 无状态变更，跳过回写")
 
     print(f"\n📊 本轮统计: 发送成功 {sent_count} | 失败 {fail_count} | 跳过 {skip_count}")
 